@@ -1,11 +1,164 @@
 import json
 import os
+import time
+import jwt
 import psycopg2
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from queries import execute
 
-def get_db_connection():
+SECRET_KEY = "neklinovsky_heroes_secret_2024"
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DATABASE_READ_CONNECT_TIMEOUT', '2'))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', '0'))
+FILTER_COLUMNS = {'region': 'district', 'rank': 'rank', 'unit': 'military_unit'}
+PATCH_COLUMNS = {
+    'name': 'full_name',
+    'birthYear': 'birth_year',
+    'deathYear': 'death_year',
+    'rank': 'rank',
+    'unit': 'military_unit',
+    'hometown': 'hometown',
+    'region': 'district',
+    'photo': 'photo_url'
+}
+
+# Connections kept across warm invocations, keyed by database URL
+_connections: Dict[str, Any] = {}
+
+def is_alive(conn) -> bool:
+    '''A connection dropped by the server still reports closed == 0 until it is used.'''
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def connect_cached(url: str, **kwargs: Any):
+    '''
+    Reuses the connection from the previous warm invocation so prepared statements
+    (see queries.py) outlive a single request; reconnects if it was closed or the
+    server dropped it while the function sat idle.
+    '''
+    conn = _connections.get(url)
+    if conn is not None and not conn.closed and not is_alive(conn):
+        conn.close()
+    if conn is None or conn.closed:
+        conn = _connections[url] = psycopg2.connect(url, **kwargs)
+    return conn
+
+def release_db_connection(conn) -> None:
+    '''Ends the request's transaction but keeps the connection open for the next invocation.'''
+    try:
+        if not conn.closed:
+            conn.rollback()
+    except psycopg2.Error:
+        conn.close()
+
+def get_db_connection(read_only: bool = False):
+    '''
+    Read-only requests go to DATABASE_READ_URL when it is set; the primary is used
+    if the replica is not configured or cannot be reached.
+    '''
+    read_url = os.environ.get('DATABASE_READ_URL')
+    if read_only and read_url:
+        try:
+            return connect_cached(read_url, connect_timeout=REPLICA_CONNECT_TIMEOUT, options='-c default_transaction_read_only=on')
+        except psycopg2.OperationalError:
+            pass
     database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+    return connect_cached(database_url)
+
+def is_replica_read(event: Dict[str, Any]) -> bool:
+    '''
+    GET requests may use the replica unless the client echoes an X-Last-Write stamp
+    younger than READ_YOUR_WRITES_SECONDS, so it sees its own changes.
+    '''
+    if event.get('httpMethod', 'GET') != 'GET':
+        return False
+    headers = event.get('headers') or {}
+    last_write = headers.get('X-Last-Write') or headers.get('x-last-write')
+    if last_write and READ_YOUR_WRITES_SECONDS > 0:
+        try:
+            return time.time() - float(last_write) > READ_YOUR_WRITES_SECONDS
+        except ValueError:
+            return False
+    return True
+
+def write_headers() -> Dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Last-Write',
+        'X-Last-Write': str(time.time())
+    }
+
+def enqueue_job(cur, kind: str, payload: Dict[str, Any], dedupe_key: str = None) -> None:
+    '''Adds a background job in the caller's transaction; backend/worker picks it up after commit.'''
+    execute(cur, 'enqueue_job', (kind, json.dumps(payload), dedupe_key))
+
+def verify_token(token: str) -> bool:
+    try:
+        jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        return True
+    except:
+        return False
+
+def build_bulk_selector(body_data: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    '''
+    Builds a WHERE clause from a list of ids or a region/rank/unit filter.
+    Returns an empty clause when neither is given so bulk calls never touch the whole table.
+    '''
+    ids = body_data.get('ids')
+    if ids:
+        if not isinstance(ids, list) or not all(isinstance(hero_id, int) or str(hero_id).isdigit() for hero_id in ids):
+            raise ValueError('ids must be a list of integers')
+        return 'id = ANY(%s)', [[int(hero_id) for hero_id in ids]]
+    
+    conditions = []
+    values = []
+    for param, column in FILTER_COLUMNS.items():
+        value = (body_data.get('filter') or {}).get(param)
+        if value:
+            conditions.append(f"{column} = %s")
+            values.append(value)
+    return ' AND '.join(conditions), values
+
+def optional_str(value: Any) -> Any:
+    '''JSON null stays NULL instead of becoming the string 'None'.'''
+    return str(value) if value is not None else None
+
+def hero_values(body_data: Dict[str, Any]) -> List[Any]:
+    return [
+        str(body_data.get('name') or ''),
+        body_data.get('birthYear') if body_data.get('birthYear') != '' else None,
+        body_data.get('deathYear') if body_data.get('deathYear') != '' else None,
+        optional_str(body_data.get('rank', '')),
+        optional_str(body_data.get('unit', '')),
+        optional_str(body_data.get('hometown', '')),
+        optional_str(body_data.get('region', 'Неклиновский район')),
+        optional_str(body_data.get('photo', '')),
+        json.dumps(body_data.get('documents', []))
+    ]
+
+def get_hero_stats(cur) -> Dict[str, Any]:
+    execute(cur, 'hero_facets')
+    stats: Dict[str, Any] = {
+        'total': 0,
+        'found': 0,
+        'missing': 0,
+        'facets': {'region': {}, 'rank': {}, 'unit': {}, 'awards': {}}
+    }
+    for facet, value, count in cur.fetchall():
+        if facet == 'total':
+            stats['total'] = count
+        elif facet == 'status':
+            stats[value] = count
+        elif facet == 'award':
+            stats['facets']['awards'][value] = count
+        else:
+            stats['facets'][facet][value] = count
+    return stats
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -13,6 +166,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Args: event с httpMethod, body, queryStringParameters
     Returns: JSON с героями или статусом операции
     '''
+    read_only = is_replica_read(event)
+    try:
+        return handle_request(event, read_only)
+    except psycopg2.OperationalError:
+        if not read_only:
+            raise
+        # The replica dropped the connection or cancelled the query on a conflict with recovery; retry once on the primary
+        return handle_request(event, False)
+
+def handle_request(event: Dict[str, Any], read_only: bool) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
@@ -20,15 +183,27 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'GET, POST, PUT, PATCH, DELETE, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token, X-Last-Write',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
-    conn = get_db_connection()
+    query_params = event.get('queryStringParameters') or {}
+    is_bulk = method == 'PATCH' or (method == 'DELETE' and not query_params.get('id') and bool(event.get('body')))
+    auth_token = (event.get('headers') or {}).get('X-Auth-Token', '')
+    
+    if is_bulk and not verify_token(auth_token):
+        return {
+            'statusCode': 401,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Unauthorized'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = get_db_connection(read_only=read_only)
     cur = conn.cursor()
     
     try:
@@ -36,12 +211,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             params = event.get('queryStringParameters') or {}
             hero_id = params.get('id')
             
+            if params.get('stats'):
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(get_hero_stats(cur)),
+                    'isBase64Encoded': False
+                }
+            
             if hero_id:
-                # Escape single quotes in hero_id for SQL safety
-                safe_id = str(hero_id).replace("'", "''")
-                cur.execute(
-                    f"SELECT id, full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url, documents FROM heroes WHERE id = '{safe_id}'"
-                )
+                execute(cur, 'hero_by_id', (hero_id,))
                 row = cur.fetchone()
                 if row:
                     hero = {
@@ -71,7 +250,37 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
             else:
-                cur.execute('SELECT id, full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url FROM heroes ORDER BY id')
+                since = params.get('since')
+                if since and not since.isdigit():
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Invalid since cursor'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Taken before the list: every transaction below this xmin has finished, so it is visible
+                # to the queries below; anything at or above it is sent again on the next since= (V0012)
+                execute(cur, 'sync_cursor')
+                synced_at = cur.fetchone()[0]
+                
+                conditions = []
+                values = []
+                for param, column in FILTER_COLUMNS.items():
+                    if params.get(param):
+                        conditions.append(f"{column} = %s")
+                        values.append(params[param])
+                if since:
+                    conditions.append("change_xid >= %s")
+                    values.append(int(since))
+                
+                if conditions:
+                    cur.execute(
+                        f"SELECT id, full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url FROM heroes WHERE {' AND '.join(conditions)} ORDER BY id",
+                        values
+                    )
+                else:
+                    execute(cur, 'list_heroes')
                 rows = cur.fetchall()
                 heroes = [{
                     'id': row[0],
@@ -85,37 +294,32 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'photo': row[8],
                     'awards': []
                 } for row in rows]
+                result = {'heroes': heroes, 'syncedAt': str(synced_at)}
+                
+                if since:
+                    execute(cur, 'deleted_heroes_since', (int(since),))
+                    result['deleted'] = [row[0] for row in cur.fetchall()]
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'heroes': heroes}),
+                    'body': json.dumps(result),
                     'isBase64Encoded': False
                 }
         
         elif method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
             
-            # Escape values for SQL
-            name = str(body_data.get('name', '')).replace("'", "''")
-            birth_year = body_data.get('birthYear', 'NULL')
-            death_year = body_data.get('deathYear', 'NULL')
-            rank = str(body_data.get('rank', '')).replace("'", "''")
-            unit = str(body_data.get('unit', '')).replace("'", "''")
-            hometown = str(body_data.get('hometown', '')).replace("'", "''")
-            region = str(body_data.get('region', 'Неклиновский район')).replace("'", "''")
-            photo = str(body_data.get('photo', '')).replace("'", "''")
-            documents = json.dumps(body_data.get('documents', [])).replace("'", "''")
-            
-            cur.execute(
-                f"INSERT INTO heroes (full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url, documents) VALUES ('{name}', {birth_year}, {death_year}, '{rank}', '{unit}', '{hometown}', '{region}', '{photo}', '{documents}') RETURNING id"
-            )
+            values = hero_values(body_data)
+            
+            execute(cur, 'insert_hero', values)
             new_id = cur.fetchone()[0]
+            enqueue_job(cur, 'refresh_hero_facets', {}, dedupe_key='refresh_hero_facets')
             conn.commit()
             
             return {
                 'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'id': new_id, 'message': 'Hero created'}),
                 'isBase64Encoded': False
             }
@@ -132,34 +336,107 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            # Escape values for SQL
-            name = str(body_data.get('name', '')).replace("'", "''")
-            birth_year = body_data.get('birthYear', 'NULL')
-            death_year = body_data.get('deathYear', 'NULL')
-            rank = str(body_data.get('rank', '')).replace("'", "''")
-            unit = str(body_data.get('unit', '')).replace("'", "''")
-            hometown = str(body_data.get('hometown', '')).replace("'", "''")
-            region = str(body_data.get('region', 'Неклиновский район')).replace("'", "''")
-            photo = str(body_data.get('photo', '')).replace("'", "''")
-            documents = json.dumps(body_data.get('documents', [])).replace("'", "''")
-            safe_id = str(hero_id).replace("'", "''")
-            
-            cur.execute(
-                f"UPDATE heroes SET full_name = '{name}', birth_year = {birth_year}, death_year = {death_year}, rank = '{rank}', military_unit = '{unit}', hometown = '{hometown}', district = '{region}', photo_url = '{photo}', documents = '{documents}', updated_at = CURRENT_TIMESTAMP WHERE id = '{safe_id}'"
-            )
+            values = hero_values(body_data)
+            
+            execute(cur, 'update_hero', values + [hero_id])
+            enqueue_job(cur, 'refresh_hero_facets', {}, dedupe_key='refresh_hero_facets')
             conn.commit()
             
             return {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'message': 'Hero updated'}),
                 'isBase64Encoded': False
             }
         
+        elif method == 'PATCH':
+            body_data = json.loads(event.get('body', '{}'))
+            try:
+                where_sql, where_values = build_bulk_selector(body_data)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e)}),
+                    'isBase64Encoded': False
+                }
+            patch = body_data.get('patch') or {}
+            assignments = []
+            values = []
+            for field, column in PATCH_COLUMNS.items():
+                if field in patch:
+                    assignments.append(f"{column} = %s")
+                    values.append(patch[field])
+            
+            if not where_sql or not assignments:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'ids or filter and a non-empty patch required'}),
+                    'isBase64Encoded': False
+                }
+            
+            try:
+                cur.execute(
+                    f"UPDATE heroes SET {', '.join(assignments)}, updated_at = CURRENT_TIMESTAMP WHERE {where_sql}",
+                    values + where_values
+                )
+            except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                conn.rollback()
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Invalid patch: {e.pgerror or e}'}),
+                    'isBase64Encoded': False
+                }
+            updated = cur.rowcount
+            enqueue_job(cur, 'refresh_hero_facets', {}, dedupe_key='refresh_hero_facets')
+            conn.commit()
+            
+            return {
+                'statusCode': 200,
+                'headers': write_headers(),
+                'body': json.dumps({'updated': updated, 'message': 'Heroes updated'}),
+                'isBase64Encoded': False
+            }
+        
         elif method == 'DELETE':
             params = event.get('queryStringParameters') or {}
             hero_id = params.get('id')
             
+            if not hero_id and event.get('body'):
+                try:
+                    where_sql, where_values = build_bulk_selector(json.loads(event['body']))
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                if where_sql:
+                    try:
+                        cur.execute(f"DELETE FROM heroes WHERE {where_sql}", where_values)
+                    except psycopg2.IntegrityError:
+                        # Heroes still referenced by hero_files, awards, photos or documents; nothing is deleted
+                        conn.rollback()
+                        return {
+                            'statusCode': 409,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': json.dumps({'error': 'Some heroes still have files, awards, photos or documents'}),
+                            'isBase64Encoded': False
+                        }
+                    deleted = cur.rowcount
+                    enqueue_job(cur, 'refresh_hero_facets', {}, dedupe_key='refresh_hero_facets')
+                    conn.commit()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': write_headers(),
+                        'body': json.dumps({'deleted': deleted, 'message': 'Heroes deleted'}),
+                        'isBase64Encoded': False
+                    }
+            
             if not hero_id:
                 return {
                     'statusCode': 400,
@@ -168,13 +445,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            safe_id = str(hero_id).replace("'", "''")
-            cur.execute(f"DELETE FROM heroes WHERE id = '{safe_id}'")
+            execute(cur, 'delete_hero', (hero_id,))
+            enqueue_job(cur, 'refresh_hero_facets', {}, dedupe_key='refresh_hero_facets')
             conn.commit()
             
             return {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'message': 'Hero deleted'}),
                 'isBase64Encoded': False
             }
@@ -189,4 +466,4 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        release_db_connection(conn)
\ No newline at end of file
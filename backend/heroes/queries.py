@@ -0,0 +1,48 @@
+'''
+Named SQL statements for the heroes API.
+Each statement is prepared server-side the first time it runs on a connection and
+executed by name afterwards, so a warm (pooled) connection plans it only once.
+'''
+
+import weakref
+from typing import Any, Dict, Optional, Sequence, Set
+
+STATEMENTS: Dict[str, str] = {
+    'hero_by_id': 'SELECT id, full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url, documents FROM heroes WHERE id = $1',
+    'list_heroes': 'SELECT id, full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url FROM heroes ORDER BY id',
+    'hero_facets': 'SELECT facet, value, hero_count FROM hero_facets',
+    'sync_cursor': 'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint',
+    'deleted_heroes_since': "SELECT DISTINCT record_id FROM deleted_records WHERE table_name = 'heroes' AND change_xid >= $1",
+    'insert_hero': 'INSERT INTO heroes (full_name, birth_year, death_year, rank, military_unit, hometown, district, photo_url, documents) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) RETURNING id',
+    'update_hero': 'UPDATE heroes SET full_name = $1, birth_year = $2, death_year = $3, rank = $4, military_unit = $5, hometown = $6, district = $7, photo_url = $8, documents = $9, updated_at = CURRENT_TIMESTAMP WHERE id = $10',
+    'delete_hero': 'DELETE FROM heroes WHERE id = $1',
+    'enqueue_job': "INSERT INTO jobs (kind, payload, dedupe_key) VALUES ($1, $2, $3) ON CONFLICT (dedupe_key) WHERE status = 'pending' DO UPDATE SET updated_at = CURRENT_TIMESTAMP"
+}
+
+# Server-side names carry the function's prefix: the self-hosted server shares pooled connections between functions
+NAME_PREFIX = 'heroes_'
+
+# Statement names prepared on each connection; None means unknown after a failed PREPARE
+_prepared: 'weakref.WeakKeyDictionary[Any, Optional[Set[str]]]' = weakref.WeakKeyDictionary()
+
+def execute(cur, name: str, params: Sequence[Any] = ()) -> None:
+    conn = cur.connection
+    prepared = _prepared.setdefault(conn, set())
+    if prepared is None:
+        cur.execute('SELECT name FROM pg_prepared_statements')
+        prepared = _prepared[conn] = {row[0] for row in cur.fetchall()}
+
+    statement_name = NAME_PREFIX + name
+    execute_sql = f"EXECUTE {statement_name}({', '.join(['%s'] * len(params))})" if params else f'EXECUTE {statement_name}'
+    if statement_name in prepared:
+        cur.execute(execute_sql, params or None)
+        return
+
+    # PREPARE and the first EXECUTE go out in one round trip
+    statement = STATEMENTS[name].replace('%', '%%') if params else STATEMENTS[name]
+    try:
+        cur.execute(f'PREPARE {statement_name} AS {statement}; {execute_sql}', params or None)
+    except Exception:
+        _prepared[conn] = None
+        raise
+    prepared.add(statement_name)
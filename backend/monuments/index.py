@@ -1,11 +1,87 @@
 import json
 import os
+import time
 import psycopg2
-from typing import Dict, Any
+from typing import Dict, Any, List
+from queries import execute
 
-def get_db_connection():
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DATABASE_READ_CONNECT_TIMEOUT', '2'))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', '0'))
+
+# Connections kept across warm invocations, keyed by database URL
+_connections: Dict[str, Any] = {}
+
+def is_alive(conn) -> bool:
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def connect_cached(url: str, **kwargs: Any):
+    conn = _connections.get(url)
+    if conn is not None and not conn.closed and not is_alive(conn):
+        conn.close()
+    if conn is None or conn.closed:
+        conn = _connections[url] = psycopg2.connect(url, **kwargs)
+    return conn
+
+def release_db_connection(conn) -> None:
+    try:
+        if not conn.closed:
+            conn.rollback()
+    except psycopg2.Error:
+        conn.close()
+
+def get_db_connection(read_only: bool = False):
+    read_url = os.environ.get('DATABASE_READ_URL')
+    if read_only and read_url:
+        try:
+            return connect_cached(read_url, connect_timeout=REPLICA_CONNECT_TIMEOUT, options='-c default_transaction_read_only=on')
+        except psycopg2.OperationalError:
+            pass
     database_url = os.environ.get('DATABASE_URL')
-    return psycopg2.connect(database_url)
+    return connect_cached(database_url)
+
+def is_replica_read(event: Dict[str, Any]) -> bool:
+    if event.get('httpMethod', 'GET') != 'GET':
+        return False
+    headers = event.get('headers') or {}
+    last_write = headers.get('X-Last-Write') or headers.get('x-last-write')
+    if last_write and READ_YOUR_WRITES_SECONDS > 0:
+        try:
+            return time.time() - float(last_write) > READ_YOUR_WRITES_SECONDS
+        except ValueError:
+            return False
+    return True
+
+def write_headers() -> Dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Last-Write',
+        'X-Last-Write': str(time.time())
+    }
+
+def optional_str(value: Any) -> Any:
+    return str(value) if value is not None else None
+
+def monument_values(body_data: Dict[str, Any]) -> List[Any]:
+    return [
+        optional_str(body_data.get('name', '')),
+        optional_str(body_data.get('type', '')),
+        optional_str(body_data.get('description', '')),
+        optional_str(body_data.get('location', '')),
+        optional_str(body_data.get('settlement', '')),
+        optional_str(body_data.get('address', '')),
+        str(body_data['coordinates']) if body_data.get('coordinates') else None,
+        body_data.get('establishmentYear') if body_data.get('establishmentYear') != '' else None,
+        str(body_data['architect']) if body_data.get('architect') else None,
+        str(body_data['imageUrl']) if body_data.get('imageUrl') else None,
+        str(body_data['history']) if body_data.get('history') else None
+    ]
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
@@ -13,6 +89,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Args: event с httpMethod, body, queryStringParameters
     Returns: JSON с монументами или статусом операции
     '''
+    read_only = is_replica_read(event)
+    try:
+        return handle_request(event, read_only)
+    except psycopg2.OperationalError:
+        if not read_only:
+            raise
+        # Replica lost or query cancelled by recovery; one retry on the primary
+        return handle_request(event, False)
+
+def handle_request(event: Dict[str, Any], read_only: bool) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
@@ -21,14 +107,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token, X-Last-Write',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=read_only)
     cur = conn.cursor()
     
     try:
@@ -37,10 +123,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             monument_id = params.get('id')
             
             if monument_id:
-                safe_id = str(monument_id).replace("'", "''")
-                cur.execute(
-                    f"SELECT id, name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history FROM t_p26485321_heroes_memorial_init.monuments WHERE id = '{safe_id}'"
-                )
+                execute(cur, 'monument_by_id', (monument_id,))
                 row = cur.fetchone()
                 if row:
                     monument = {
@@ -58,9 +141,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'history': row[11]
                     }
                     
-                    cur.execute(
-                        f"SELECT id, title, photo_url, description, photo_year FROM t_p26485321_heroes_memorial_init.monument_photos WHERE monument_id = '{safe_id}' ORDER BY upload_date DESC"
-                    )
+                    execute(cur, 'monument_photos', (monument_id,))
                     photos = []
                     for photo_row in cur.fetchall():
                         photos.append({
@@ -86,7 +167,22 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
             else:
-                cur.execute('SELECT id, name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history FROM t_p26485321_heroes_memorial_init.monuments ORDER BY id')
+                since = params.get('since')
+                if since and not since.isdigit():
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Invalid since cursor'}),
+                        'isBase64Encoded': False
+                    }
+                
+                execute(cur, 'sync_cursor')
+                synced_at = cur.fetchone()[0]
+                
+                if since:
+                    execute(cur, 'list_monuments_since', (int(since),))
+                else:
+                    execute(cur, 'list_monuments')
                 rows = cur.fetchall()
                 monuments = [{
                     'id': row[0],
@@ -102,58 +198,29 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'imageUrl': row[10],
                     'history': row[11]
                 } for row in rows]
+                result = {'monuments': monuments, 'syncedAt': str(synced_at)}
+                
+                if since:
+                    execute(cur, 'deleted_monuments_since', (int(since),))
+                    result['deleted'] = [row[0] for row in cur.fetchall()]
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'monuments': monuments}),
+                    'body': json.dumps(result),
                     'isBase64Encoded': False
                 }
         
         elif method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
             
-            name = str(body_data.get('name', '')).replace("'", "''")
-            monument_type = str(body_data.get('type', '')).replace("'", "''")
-            description = str(body_data.get('description', '')).replace("'", "''")
-            location = str(body_data.get('location', '')).replace("'", "''")
-            settlement = str(body_data.get('settlement', '')).replace("'", "''")
-            address = str(body_data.get('address', '')).replace("'", "''")
-            coordinates = str(body_data.get('coordinates', '')).replace("'", "''") if body_data.get('coordinates') else 'NULL'
-            establishment_year = body_data.get('establishmentYear', 'NULL')
-            architect = str(body_data.get('architect', '')).replace("'", "''") if body_data.get('architect') else 'NULL'
-            image_url = str(body_data.get('imageUrl', '')).replace("'", "''") if body_data.get('imageUrl') else 'NULL'
-            history = str(body_data.get('history', '')).replace("'", "''") if body_data.get('history') else 'NULL'
-            
-            if coordinates == 'NULL':
-                coordinates_sql = 'NULL'
-            else:
-                coordinates_sql = f"'{coordinates}'"
-            
-            if architect == 'NULL':
-                architect_sql = 'NULL'
-            else:
-                architect_sql = f"'{architect}'"
-                
-            if image_url == 'NULL':
-                image_url_sql = 'NULL'
-            else:
-                image_url_sql = f"'{image_url}'"
-                
-            if history == 'NULL':
-                history_sql = 'NULL'
-            else:
-                history_sql = f"'{history}'"
-            
-            cur.execute(
-                f"INSERT INTO t_p26485321_heroes_memorial_init.monuments (name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history) VALUES ('{name}', '{monument_type}', '{description}', '{location}', '{settlement}', '{address}', {coordinates_sql}, {establishment_year}, {architect_sql}, {image_url_sql}, {history_sql}) RETURNING id"
-            )
+            execute(cur, 'insert_monument', monument_values(body_data))
             new_id = cur.fetchone()[0]
             conn.commit()
             
             return {
                 'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'id': new_id, 'message': 'Monument created'}),
                 'isBase64Encoded': False
             }
@@ -170,47 +237,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            name = str(body_data.get('name', '')).replace("'", "''")
-            monument_type = str(body_data.get('type', '')).replace("'", "''")
-            description = str(body_data.get('description', '')).replace("'", "''")
-            location = str(body_data.get('location', '')).replace("'", "''")
-            settlement = str(body_data.get('settlement', '')).replace("'", "''")
-            address = str(body_data.get('address', '')).replace("'", "''")
-            coordinates = str(body_data.get('coordinates', '')).replace("'", "''") if body_data.get('coordinates') else 'NULL'
-            establishment_year = body_data.get('establishmentYear', 'NULL')
-            architect = str(body_data.get('architect', '')).replace("'", "''") if body_data.get('architect') else 'NULL'
-            image_url = str(body_data.get('imageUrl', '')).replace("'", "''") if body_data.get('imageUrl') else 'NULL'
-            history = str(body_data.get('history', '')).replace("'", "''") if body_data.get('history') else 'NULL'
-            safe_id = str(monument_id).replace("'", "''")
-            
-            if coordinates == 'NULL':
-                coordinates_sql = 'NULL'
-            else:
-                coordinates_sql = f"'{coordinates}'"
-            
-            if architect == 'NULL':
-                architect_sql = 'NULL'
-            else:
-                architect_sql = f"'{architect}'"
-                
-            if image_url == 'NULL':
-                image_url_sql = 'NULL'
-            else:
-                image_url_sql = f"'{image_url}'"
-                
-            if history == 'NULL':
-                history_sql = 'NULL'
-            else:
-                history_sql = f"'{history}'"
-            
-            cur.execute(
-                f"UPDATE t_p26485321_heroes_memorial_init.monuments SET name = '{name}', type = '{monument_type}', description = '{description}', location = '{location}', settlement = '{settlement}', address = '{address}', coordinates = {coordinates_sql}, establishment_year = {establishment_year}, architect = {architect_sql}, image_url = {image_url_sql}, history = {history_sql}, updated_at = CURRENT_TIMESTAMP WHERE id = '{safe_id}'"
-            )
+            execute(cur, 'update_monument', monument_values(body_data) + [monument_id])
             conn.commit()
             
             return {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'message': 'Monument updated'}),
                 'isBase64Encoded': False
             }
@@ -227,14 +259,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            safe_id = str(monument_id).replace("'", "''")
-            cur.execute(f"DELETE FROM t_p26485321_heroes_memorial_init.monument_photos WHERE monument_id = '{safe_id}'")
-            cur.execute(f"DELETE FROM t_p26485321_heroes_memorial_init.monuments WHERE id = '{safe_id}'")
+            execute(cur, 'delete_monument_photos', (monument_id,))
+            execute(cur, 'delete_monument', (monument_id,))
             conn.commit()
             
             return {
                 'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'headers': write_headers(),
                 'body': json.dumps({'message': 'Monument deleted'}),
                 'isBase64Encoded': False
             }
@@ -249,4 +280,4 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     finally:
         cur.close()
-        conn.close()
+        release_db_connection(conn)
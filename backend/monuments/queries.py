@@ -0,0 +1,47 @@
+'''
+Named, parameterized SQL statements for the monuments API, prepared once per connection.
+'''
+
+import weakref
+from typing import Any, Dict, Optional, Sequence, Set
+
+STATEMENTS: Dict[str, str] = {
+    'monument_by_id': 'SELECT id, name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history FROM t_p26485321_heroes_memorial_init.monuments WHERE id = $1',
+    'monument_photos': 'SELECT id, title, photo_url, description, photo_year FROM t_p26485321_heroes_memorial_init.monument_photos WHERE monument_id = $1 ORDER BY upload_date DESC',
+    'list_monuments': 'SELECT id, name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history FROM t_p26485321_heroes_memorial_init.monuments ORDER BY id',
+    'list_monuments_since': "SELECT id, name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history FROM t_p26485321_heroes_memorial_init.monuments WHERE change_xid >= $1 ORDER BY id",
+    'sync_cursor': 'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint',
+    'deleted_monuments_since': "SELECT DISTINCT record_id FROM deleted_records WHERE table_name = 'monuments' AND change_xid >= $1",
+    'insert_monument': 'INSERT INTO t_p26485321_heroes_memorial_init.monuments (name, type, description, location, settlement, address, coordinates, establishment_year, architect, image_url, history) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11) RETURNING id',
+    'update_monument': 'UPDATE t_p26485321_heroes_memorial_init.monuments SET name = $1, type = $2, description = $3, location = $4, settlement = $5, address = $6, coordinates = $7, establishment_year = $8, architect = $9, image_url = $10, history = $11, updated_at = CURRENT_TIMESTAMP WHERE id = $12',
+    'delete_monument_photos': 'DELETE FROM t_p26485321_heroes_memorial_init.monument_photos WHERE monument_id = $1',
+    'delete_monument': 'DELETE FROM t_p26485321_heroes_memorial_init.monuments WHERE id = $1'
+}
+
+# Server-side names carry the function's prefix: the self-hosted server shares pooled connections between functions
+NAME_PREFIX = 'monuments_'
+
+# Statement names prepared on each connection; None means unknown after a failed PREPARE
+_prepared: 'weakref.WeakKeyDictionary[Any, Optional[Set[str]]]' = weakref.WeakKeyDictionary()
+
+def execute(cur, name: str, params: Sequence[Any] = ()) -> None:
+    conn = cur.connection
+    prepared = _prepared.setdefault(conn, set())
+    if prepared is None:
+        cur.execute('SELECT name FROM pg_prepared_statements')
+        prepared = _prepared[conn] = {row[0] for row in cur.fetchall()}
+
+    statement_name = NAME_PREFIX + name
+    execute_sql = f"EXECUTE {statement_name}({', '.join(['%s'] * len(params))})" if params else f'EXECUTE {statement_name}'
+    if statement_name in prepared:
+        cur.execute(execute_sql, params or None)
+        return
+
+    # PREPARE and the first EXECUTE go out in one round trip
+    statement = STATEMENTS[name].replace('%', '%%') if params else STATEMENTS[name]
+    try:
+        cur.execute(f'PREPARE {statement_name} AS {statement}; {execute_sql}', params or None)
+    except Exception:
+        _prepared[conn] = None
+        raise
+    prepared.add(statement_name)
@@ -0,0 +1,192 @@
+'''
+Business: Run every backend function in one process for self-hosted installs
+Args: command line options (host, port, workers, jobs); DATABASE_URL, DATABASE_READ_URL and S3_* from the environment
+Returns: HTTP server that routes /<function> to that function's handler(event, context)
+'''
+
+import argparse
+import asyncio
+import base64
+import importlib.util
+import os
+import sys
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from psycopg2.pool import ThreadedConnectionPool
+from typing import Dict, Any, Optional
+from aiohttp import web
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ['auth', 'heroes', 'monuments', 'upload', 'upload-file', 'submissions']
+
+class PooledConnection:
+    '''Hands a pooled psycopg2 connection to a handler; close() returns it to the pool instead of closing it.'''
+
+    def __init__(self, pool: ThreadedConnectionPool):
+        self._pool = pool
+        self._conn = pool.getconn()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        broken = self._conn.closed != 0
+        if not broken:
+            self._conn.rollback()
+        self._pool.putconn(self._conn, close=broken)
+        self._conn = None
+
+class SharedResources:
+    def __init__(self, workers: int):
+        self.primary = ThreadedConnectionPool(1, workers, os.environ.get('DATABASE_URL'))
+        self.replica: Optional[ThreadedConnectionPool] = None
+        read_url = os.environ.get('DATABASE_READ_URL')
+        if read_url:
+            try:
+                self.replica = ThreadedConnectionPool(
+                    0, workers, read_url,
+                    connect_timeout=int(os.environ.get('DATABASE_READ_CONNECT_TIMEOUT', '2')),
+                    options='-c default_transaction_read_only=on'
+                )
+            except psycopg2.OperationalError:
+                self.replica = None
+        self.s3_client = None
+
+    def get_db_connection(self, read_only: bool = False) -> PooledConnection:
+        if read_only and self.replica:
+            try:
+                return PooledConnection(self.replica)
+            except psycopg2.Error:
+                pass
+        return PooledConnection(self.primary)
+
+    def release_db_connection(self, conn: PooledConnection) -> None:
+        conn.close()
+
+    def get_s3_client(self):
+        if self.s3_client is None:
+            import boto3
+            self.s3_client = boto3.client(
+                's3',
+                endpoint_url='https://storage.yandexcloud.net',
+                aws_access_key_id=os.environ.get('S3_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.environ.get('S3_SECRET_ACCESS_KEY'),
+                region_name='ru-central1'
+            )
+        return self.s3_client
+
+    def close(self) -> None:
+        self.primary.closeall()
+        if self.replica:
+            self.replica.closeall()
+
+def load_function(name: str, resources: SharedResources):
+    '''Imports backend/<name>/index.py and points its connection and S3 factories at the shared ones.'''
+    function_dir = os.path.join(BACKEND_DIR, name)
+    # Functions may have sibling modules with the same name (queries.py), so each import gets a clean slate
+    local_modules = [file_name[:-3] for file_name in os.listdir(function_dir) if file_name.endswith('.py') and file_name != 'index.py']
+    spec = importlib.util.spec_from_file_location(f"{name.replace('-', '_')}_index", os.path.join(function_dir, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, function_dir)
+    try:
+        for local_module in local_modules:
+            sys.modules.pop(local_module, None)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(function_dir)
+        for local_module in local_modules:
+            sys.modules.pop(local_module, None)
+    if hasattr(module, 'get_db_connection'):
+        module.get_db_connection = resources.get_db_connection
+    if hasattr(module, 'release_db_connection'):
+        module.release_db_connection = resources.release_db_connection
+    if hasattr(module, 'get_s3_client'):
+        module.get_s3_client = resources.get_s3_client
+    return module
+
+def normalize_header(name: str) -> str:
+    return '-'.join(part.capitalize() for part in name.split('-'))
+
+async def build_event(request: web.Request) -> Dict[str, Any]:
+    raw_body = await request.read()
+    try:
+        body = raw_body.decode('utf-8')
+        is_base64 = False
+    except UnicodeDecodeError:
+        body = base64.b64encode(raw_body).decode('ascii')
+        is_base64 = True
+    return {
+        'httpMethod': request.method,
+        'headers': {normalize_header(key): value for key, value in request.headers.items()},
+        'queryStringParameters': dict(request.query),
+        'body': body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {'identity': {'sourceIp': request.remote}}
+    }
+
+def build_response(result: Dict[str, Any]) -> web.Response:
+    body = result.get('body') or ''
+    if result.get('isBase64Encoded'):
+        body_bytes = base64.b64decode(body)
+    else:
+        body_bytes = body.encode('utf-8') if isinstance(body, str) else body
+    return web.Response(status=result.get('statusCode', 200), headers=result.get('headers') or {}, body=body_bytes)
+
+def make_route(module, executor: ThreadPoolExecutor):
+    async def route(request: web.Request) -> web.Response:
+        event = await build_event(request)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(executor, partial(module.handler, event, None))
+        return build_response(result)
+    return route
+
+async def drain_jobs(worker_module, executor: ThreadPoolExecutor, interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        counts = await loop.run_in_executor(executor, worker_module.drain, 100)
+        if counts['done'] + counts['failed'] == 0:
+            await asyncio.sleep(interval)
+
+def create_app(workers: int, jobs_interval: Optional[float] = None) -> web.Application:
+    resources = SharedResources(workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    modules = {name: load_function(name, resources) for name in FUNCTIONS}
+
+    app = web.Application()
+    for name, module in modules.items():
+        route = make_route(module, executor)
+        app.router.add_route('*', f'/{name}', route)
+        app.router.add_route('*', f'/{name}/', route)
+
+    async def lifecycle(app: web.Application):
+        task = None
+        if jobs_interval:
+            task = asyncio.create_task(drain_jobs(load_function('worker', resources), executor, jobs_interval))
+        yield
+        if task:
+            task.cancel()
+        executor.shutdown(wait=True)
+        resources.close()
+
+    app.cleanup_ctx.append(lifecycle)
+    return app
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Self-hosted server for all backend functions')
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SERVER_PORT', 8080)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', 8)),
+                        help='handler threads; also the size of each connection pool')
+    parser.add_argument('--jobs', type=float, metavar='SECONDS', default=float(os.environ.get('SERVER_JOBS_INTERVAL', 2)),
+                        help='seconds between background job queue polls when the queue is empty (default 2)')
+    parser.add_argument('--no-jobs', dest='jobs', action='store_const', const=None,
+                        help='do not drain the job queue here; run backend/worker separately instead')
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.workers, args.jobs), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
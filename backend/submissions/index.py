@@ -0,0 +1,214 @@
+'''
+Business: Accept public submissions from relatives and let moderators review them
+Args: event with httpMethod, body, queryStringParameters, headers (X-Auth-Token, Idempotency-Key)
+Returns: HTTP response with submission id, a page of submissions or claimed work
+'''
+
+import json
+import jwt
+import hashlib
+import os
+import uuid
+import psycopg2
+from typing import Dict, Any, Optional
+
+SECRET_KEY = "neklinovsky_heroes_secret_2024"
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+PAGE_SIZE = 50
+CLAIM_TIMEOUT_MINUTES = 30
+SUBMISSION_COLUMNS = 'id, hero_name, relationship, document_type, description, year, email, status, claimed_by, created_at, reviewed_at'
+
+def get_db_connection():
+    return psycopg2.connect(DATABASE_URL)
+
+def get_login(token: str) -> Optional[str]:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=['HS256']).get('login')
+    except:
+        return None
+
+def get_fingerprint(body_data: Dict[str, Any]) -> str:
+    parts = [body_data.get(field) or '' for field in ['heroName', 'email', 'documentType', 'year']]
+    normalized = '|'.join(' '.join(str(part).lower().split()) for part in parts)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def submission_from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'heroName': row[1],
+        'relationship': row[2],
+        'documentType': row[3],
+        'description': row[4],
+        'year': row[5],
+        'email': row[6],
+        'status': row[7],
+        'claimedBy': row[8],
+        'createdAt': row[9].isoformat() if row[9] else None,
+        'reviewedAt': row[10].isoformat() if row[10] else None
+    }
+
+def json_response(status_code: int, body: Any) -> Dict[str, Any]:
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'isBase64Encoded': False,
+        'body': json.dumps(body)
+    }
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'GET')
+
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, PATCH, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token, Idempotency-Key',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': ''
+        }
+
+    headers = event.get('headers') or {}
+    login = get_login(headers.get('X-Auth-Token', ''))
+
+    if method in ['GET', 'PATCH'] and not login:
+        return json_response(401, {'error': 'Unauthorized'})
+
+    if method not in ['GET', 'POST', 'PATCH']:
+        return json_response(405, {'error': 'Method not allowed'})
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if method == 'POST':
+            body_data = json.loads(event.get('body', '{}'))
+            if not body_data.get('heroName') or not body_data.get('email'):
+                return json_response(400, {'error': 'heroName and email are required'})
+
+            idempotency_key = headers.get('Idempotency-Key') or body_data.get('idempotencyKey')
+            fingerprint = get_fingerprint(body_data)
+
+            # Retries with the same key and identical pending submissions hit a unique index and return the existing row
+            cursor.execute(
+                """
+                INSERT INTO submissions (hero_name, relationship, document_type, description, year, email, idempotency_key, fingerprint)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+                """,
+                (
+                    body_data.get('heroName'),
+                    body_data.get('relationship'),
+                    body_data.get('documentType'),
+                    body_data.get('description'),
+                    body_data.get('year'),
+                    body_data.get('email'),
+                    idempotency_key,
+                    fingerprint
+                )
+            )
+            row = cursor.fetchone()
+            if row:
+                conn.commit()
+                return json_response(201, {'id': row[0], 'status': 'pending'})
+
+            cursor.execute(
+                "SELECT id, status FROM submissions WHERE idempotency_key = %s OR (fingerprint = %s AND status = 'pending') LIMIT 1",
+                (idempotency_key, fingerprint)
+            )
+            existing = cursor.fetchone()
+            conn.commit()
+            if not existing:
+                return json_response(409, {'error': 'Submission conflict, retry'})
+            return json_response(200, {'id': existing[0], 'status': existing[1], 'duplicate': True})
+
+        if method == 'GET':
+            params = event.get('queryStringParameters') or {}
+            status = params.get('status', 'pending')
+            try:
+                after = int(params.get('after', 0))
+                limit = min(int(params.get('limit', PAGE_SIZE)), PAGE_SIZE)
+            except (TypeError, ValueError):
+                return json_response(400, {'error': 'after and limit must be integers'})
+            if limit < 1:
+                return json_response(400, {'error': 'limit must be positive'})
+
+            cursor.execute(
+                f"SELECT {SUBMISSION_COLUMNS} FROM submissions WHERE status = %s AND id > %s ORDER BY id LIMIT %s",
+                (status, after, limit)
+            )
+            submissions = [submission_from_row(row) for row in cursor.fetchall()]
+            next_after = submissions[-1]['id'] if len(submissions) == limit else None
+
+            return json_response(200, {'submissions': submissions, 'nextAfter': next_after})
+
+        body_data = json.loads(event.get('body', '{}'))
+        action = body_data.get('action')
+
+        if action == 'claim':
+            try:
+                limit = min(int(body_data.get('limit', 10)), PAGE_SIZE)
+            except (TypeError, ValueError):
+                return json_response(400, {'error': 'limit must be an integer'})
+            if limit < 1:
+                return json_response(400, {'error': 'limit must be positive'})
+            # Moderators share one login, so each claim gets its own token that review must present
+            claim_token = uuid.uuid4().hex
+            # SKIP LOCKED lets several moderators claim at once without waiting on or taking each other's rows
+            cursor.execute(
+                f"""
+                UPDATE submissions SET status = 'in_review', claimed_by = %s, claim_token = %s, claimed_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM submissions
+                    WHERE status = 'pending'
+                       OR (status = 'in_review' AND claimed_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 minute')
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT %s
+                )
+                RETURNING {SUBMISSION_COLUMNS}
+                """,
+                (login, claim_token, CLAIM_TIMEOUT_MINUTES, limit)
+            )
+            claimed = sorted((submission_from_row(row) for row in cursor.fetchall()), key=lambda s: s['id'])
+            conn.commit()
+
+            return json_response(200, {'submissions': claimed, 'claimToken': claim_token if claimed else None})
+
+        if action == 'review':
+            submission_id = body_data.get('id')
+            status = body_data.get('status')
+            claim_token = body_data.get('claimToken')
+            if not submission_id or status not in ['approved', 'rejected'] or not claim_token:
+                return json_response(400, {'error': 'id, claimToken and status (approved or rejected) required'})
+            try:
+                submission_id = int(submission_id)
+            except (TypeError, ValueError):
+                return json_response(400, {'error': 'id must be an integer'})
+
+            cursor.execute(
+                "UPDATE submissions SET status = %s, reviewed_at = CURRENT_TIMESTAMP WHERE id = %s AND status = 'in_review' AND claimed_by = %s AND claim_token = %s",
+                (status, submission_id, login, claim_token)
+            )
+            updated = cursor.rowcount
+            conn.commit()
+
+            if not updated:
+                return json_response(409, {'error': 'Submission is not held by this claim'})
+            return json_response(200, {'id': submission_id, 'status': status})
+
+        return json_response(400, {'error': 'Unknown action'})
+
+    except Exception as e:
+        conn.rollback()
+        return json_response(500, {'error': str(e)})
+
+    finally:
+        cursor.close()
+        conn.close()
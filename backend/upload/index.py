@@ -9,11 +9,16 @@ import jwt
 import base64
 import uuid
 import os
+import time
 import psycopg2
-from typing import Dict, Any
+import psycopg2.errors
+from typing import Dict, Any, List, Tuple
 
 SECRET_KEY = "neklinovsky_heroes_secret_2024"
 DATABASE_URL = os.environ.get('DATABASE_URL', '')
+DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL', '')
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DATABASE_READ_CONNECT_TIMEOUT', '2'))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', '0'))
 
 def verify_token(token: str) -> bool:
     try:
@@ -22,7 +27,67 @@ def verify_token(token: str) -> bool:
     except:
         return False
 
+def get_db_connection(read_only: bool = False):
+    if read_only and DATABASE_READ_URL:
+        try:
+            conn = psycopg2.connect(DATABASE_READ_URL, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+            conn.set_session(readonly=True)
+            return conn
+        except psycopg2.OperationalError:
+            pass
+    return psycopg2.connect(DATABASE_URL)
+
+def is_replica_read(event: Dict[str, Any]) -> bool:
+    if event.get('httpMethod', 'GET') != 'GET':
+        return False
+    headers = event.get('headers') or {}
+    last_write = headers.get('X-Last-Write') or headers.get('x-last-write')
+    if last_write and READ_YOUR_WRITES_SECONDS > 0:
+        try:
+            return time.time() - float(last_write) > READ_YOUR_WRITES_SECONDS
+        except ValueError:
+            return False
+    return True
+
+def write_headers() -> Dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Last-Write',
+        'X-Last-Write': str(time.time())
+    }
+
+def enqueue_job(cur, kind: str, payload: Dict[str, Any], dedupe_key: str = None) -> None:
+    '''Adds a background job in the caller's transaction; backend/worker picks it up after commit.'''
+    cur.execute(
+        "INSERT INTO jobs (kind, payload, dedupe_key) VALUES (%s, %s, %s) ON CONFLICT (dedupe_key) WHERE status = 'pending' DO UPDATE SET updated_at = CURRENT_TIMESTAMP",
+        (kind, json.dumps(payload), dedupe_key)
+    )
+
+def build_bulk_selector(body_data: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    ids = body_data.get('ids')
+    if ids:
+        if not isinstance(ids, list) or not all(isinstance(file_id, int) or str(file_id).isdigit() for file_id in ids):
+            raise ValueError('ids must be a list of integers')
+        return 'id = ANY(%s)', [[int(file_id) for file_id in ids]]
+    hero_id = (body_data.get('filter') or {}).get('hero_id')
+    if hero_id:
+        if not (isinstance(hero_id, int) or str(hero_id).isdigit()):
+            raise ValueError('filter.hero_id must be an integer')
+        return 'hero_id = %s', [int(hero_id)]
+    return '', []
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    read_only = is_replica_read(event)
+    try:
+        return handle_request(event, read_only)
+    except psycopg2.OperationalError:
+        if not read_only:
+            raise
+        # Same fallback as heroes: a failed replica read is retried once on the primary
+        return handle_request(event, False)
+
+def handle_request(event: Dict[str, Any], read_only: bool) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
@@ -30,8 +95,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
+                'Access-Control-Allow-Methods': 'GET, POST, PATCH, DELETE, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token, X-Last-Write',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
@@ -39,7 +104,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     auth_token = event.get('headers', {}).get('X-Auth-Token', '')
     
-    if method in ['POST', 'DELETE'] and not verify_token(auth_token):
+    if method in ['POST', 'PATCH', 'DELETE'] and not verify_token(auth_token):
         return {
             'statusCode': 401,
             'headers': {
@@ -50,22 +115,23 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': json.dumps({'error': 'Unauthorized'})
         }
     
-    conn = psycopg2.connect(DATABASE_URL)
+    conn = get_db_connection(read_only=read_only)
     cursor = conn.cursor()
     
     try:
         if method == 'GET':
             params = event.get('queryStringParameters', {})
             hero_id = params.get('hero_id')
+            # Files not yet moved to S3 by the worker are served from their stored data URL
             
             if hero_id:
                 cursor.execute(
-                    "SELECT id, hero_id, file_name, file_type, file_url, uploaded_at FROM hero_files WHERE hero_id = %s ORDER BY uploaded_at DESC",
+                    "SELECT id, hero_id, file_name, file_type, COALESCE(file_data, file_url), uploaded_at FROM hero_files WHERE hero_id = %s ORDER BY uploaded_at DESC",
                     (hero_id,)
                 )
             else:
                 cursor.execute(
-                    "SELECT id, hero_id, file_name, file_type, file_url, uploaded_at FROM hero_files ORDER BY uploaded_at DESC"
+                    "SELECT id, hero_id, file_name, file_type, COALESCE(file_data, file_url), uploaded_at FROM hero_files ORDER BY uploaded_at DESC"
                 )
             
             rows = cursor.fetchall()
@@ -115,14 +181,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             )
             
             new_id = cursor.fetchone()[0]
+            enqueue_job(cursor, 'store_hero_file', {'file_id': new_id})
             conn.commit()
             
             return {
                 'statusCode': 201,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
+                'headers': write_headers(),
                 'isBase64Encoded': False,
                 'body': json.dumps({
                     'id': new_id,
@@ -133,10 +197,60 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
+        if method == 'PATCH':
+            body_data = json.loads(event.get('body', '{}'))
+            where_sql, where_values = build_bulk_selector(body_data)
+            patch = body_data.get('patch') or {}
+            assignments = []
+            values = []
+            for column in ['hero_id', 'file_name', 'file_type']:
+                if column in patch:
+                    assignments.append(f"{column} = %s")
+                    values.append(patch[column])
+            
+            if not where_sql or not assignments:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'isBase64Encoded': False,
+                    'body': json.dumps({'error': 'ids or filter and a non-empty patch required'})
+                }
+            
+            cursor.execute(
+                f"UPDATE hero_files SET {', '.join(assignments)} WHERE {where_sql}",
+                values + where_values
+            )
+            updated = cursor.rowcount
+            conn.commit()
+            
+            return {
+                'statusCode': 200,
+                'headers': write_headers(),
+                'isBase64Encoded': False,
+                'body': json.dumps({'success': True, 'updated': updated})
+            }
+        
         if method == 'DELETE':
             params = event.get('queryStringParameters', {})
             file_id = params.get('id')
             
+            if not file_id and event.get('body'):
+                where_sql, where_values = build_bulk_selector(json.loads(event['body']))
+                if where_sql:
+                    cursor.execute(f"DELETE FROM hero_files WHERE {where_sql}", where_values)
+                    deleted = cursor.rowcount
+                    conn.commit()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': write_headers(),
+                        'isBase64Encoded': False,
+                        'body': json.dumps({'success': True, 'deleted': deleted})
+                    }
+            
             if not file_id:
                 return {
                     'statusCode': 400,
@@ -153,16 +267,44 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             return {
                 'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
+                'headers': write_headers(),
                 'isBase64Encoded': False,
                 'body': json.dumps({'success': True})
             }
     
-    except Exception as e:
+    except ValueError as e:
+        if not conn.closed:
+            conn.rollback()
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
         conn.rollback()
+        # A patch pointing files at a hero that does not exist violates the hero_id foreign key
+        is_conflict = isinstance(e, psycopg2.errors.ForeignKeyViolation)
+        return {
+            'statusCode': 409 if is_conflict else 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Hero does not exist' if is_conflict else 'Invalid file data'})
+        }
+    
+    except Exception as e:
+        # A dropped connection cannot roll back; keep the original error so handler can retry on the primary
+        if not conn.closed:
+            conn.rollback()
+        if read_only and isinstance(e, psycopg2.OperationalError):
+            raise
         return {
             'statusCode': 500,
             'headers': {
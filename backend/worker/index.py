@@ -0,0 +1,195 @@
+'''
+Business: Drain the background job queue (hero facets refresh, hero file migration to S3)
+Args: event from a timer trigger with optional queryStringParameters (limit); run as a script for a long-lived worker
+Returns: HTTP response with counts of processed jobs
+'''
+
+import argparse
+import base64
+import json
+import mimetypes
+import os
+import time
+import boto3
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+LOCK_TIMEOUT_SECONDS = 600
+
+def get_db_connection():
+    return psycopg2.connect(DATABASE_URL)
+
+def get_s3_client():
+    return boto3.client(
+        's3',
+        endpoint_url='https://storage.yandexcloud.net',
+        aws_access_key_id=os.environ.get('S3_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('S3_SECRET_ACCESS_KEY'),
+        region_name='ru-central1'
+    )
+
+def refresh_hero_facets(cur, payload: Dict[str, Any]) -> None:
+    cur.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY hero_facets')
+
+def decode_file_data(file_data: str) -> Tuple[bytes, Optional[str]]:
+    '''Accepts a data URL (data:<type>;base64,<data>) as sent by the frontend, or bare base64.'''
+    content_type = None
+    if file_data.startswith('data:'):
+        header, _, file_data = file_data.partition(',')
+        content_type = header[len('data:'):].split(';')[0] or None
+    return base64.b64decode(file_data, validate=True), content_type
+
+def store_hero_file(cur, payload: Dict[str, Any]) -> None:
+    cur.execute(
+        "SELECT hero_id, file_name, file_url, file_data FROM hero_files WHERE id = %s FOR UPDATE",
+        (payload['file_id'],)
+    )
+    row = cur.fetchone()
+    if not row or not row[3]:
+        return
+
+    hero_id, file_name, file_url, file_data = row
+    body, content_type = decode_file_data(file_data)
+    bucket_name = os.environ.get('S3_BUCKET_NAME')
+    key = f"hero-files/{hero_id}/{file_url.rsplit('/', 1)[-1]}"
+    s3_client = get_s3_client()
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=body,
+        ContentType=content_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+        ACL='public-read'
+    )
+    # file_data is the only copy until the object is confirmed in S3
+    stored = s3_client.head_object(Bucket=bucket_name, Key=key)
+    if stored.get('ContentLength') != len(body):
+        raise RuntimeError(f"S3 object {key} has {stored.get('ContentLength')} bytes, expected {len(body)}")
+    cur.execute(
+        "UPDATE hero_files SET file_url = %s, file_data = NULL WHERE id = %s",
+        (f"https://storage.yandexcloud.net/{bucket_name}/{key}", payload['file_id'])
+    )
+
+JOB_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any]], None]] = {
+    'refresh_hero_facets': refresh_hero_facets,
+    'store_hero_file': store_hero_file
+}
+
+def claim_job(conn) -> Optional[tuple]:
+    '''
+    Claims one due job with FOR UPDATE SKIP LOCKED so concurrent workers never take the same row.
+    Jobs left running by a crashed worker are picked up again after LOCK_TIMEOUT_SECONDS,
+    unless they have used up max_attempts, in which case they are marked dead.
+    '''
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE jobs SET status = 'dead', locked_at = NULL, last_error = 'Lock timed out', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND locked_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second' AND attempts >= max_attempts
+            """,
+            (LOCK_TIMEOUT_SECONDS,)
+        )
+        cur.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (status = 'pending' AND run_at <= CURRENT_TIMESTAMP)
+                   OR (status = 'running' AND locked_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second' AND attempts < max_attempts)
+                ORDER BY run_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, kind, payload, attempts, max_attempts
+            """,
+            (LOCK_TIMEOUT_SECONDS,)
+        )
+        job = cur.fetchone()
+    conn.commit()
+    return job
+
+def run_job(conn, job: tuple) -> bool:
+    job_id, kind, payload, attempts, max_attempts = job
+    try:
+        with conn.cursor() as cur:
+            job_handler = JOB_HANDLERS.get(kind)
+            if not job_handler:
+                raise ValueError(f'Unknown job kind: {kind}')
+            job_handler(cur, payload or {})
+            cur.execute(
+                "UPDATE jobs SET status = 'done', locked_at = NULL, last_error = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (job_id,)
+            )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        # Retries drop dedupe_key so they never collide with a fresh pending job of the same key
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+                    run_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second', locked_at = NULL, dedupe_key = NULL, last_error = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                (delay, str(e), job_id)
+            )
+        conn.commit()
+        return False
+
+def drain(limit: int) -> Dict[str, int]:
+    counts = {'done': 0, 'failed': 0}
+    conn = get_db_connection()
+    try:
+        while counts['done'] + counts['failed'] < limit:
+            job = claim_job(conn)
+            if not job:
+                break
+            counts['done' if run_job(conn, job) else 'failed'] += 1
+    finally:
+        conn.close()
+    return counts
+
+def work(batch: int, poll_interval: float, once: bool) -> None:
+    '''Drains in its own loop so one slow job never holds up the other threads.'''
+    while True:
+        counts = drain(batch)
+        if counts['done'] + counts['failed'] == 0:
+            if once:
+                return
+            time.sleep(poll_interval)
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    limit = int(params.get('limit', 100))
+    counts = drain(limit)
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'isBase64Encoded': False,
+        'body': json.dumps(counts)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Background job worker')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('WORKER_CONCURRENCY', 4)))
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--once', action='store_true', help='drain due jobs and exit')
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        workers = [pool.submit(work, args.batch, args.poll_interval, args.once) for _ in range(args.concurrency)]
+        for worker in workers:
+            worker.result()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+-- Aggregated hero counts for the stats/facets mode of the heroes API
+CREATE MATERIALIZED VIEW IF NOT EXISTS hero_facets AS
+SELECT 'total' AS facet, '' AS value, COUNT(*) AS hero_count FROM heroes
+UNION ALL
+SELECT 'region', COALESCE(district, ''), COUNT(*) FROM heroes GROUP BY 2
+UNION ALL
+SELECT 'rank', COALESCE(rank, ''), COUNT(*) FROM heroes GROUP BY 2
+UNION ALL
+SELECT 'unit', COALESCE(military_unit, ''), COUNT(*) FROM heroes GROUP BY 2
+UNION ALL
+SELECT 'status', CASE WHEN death_year IS NULL THEN 'missing' ELSE 'found' END, COUNT(*)
+FROM heroes GROUP BY 2
+UNION ALL
+SELECT 'award', award_name, COUNT(DISTINCT hero_id) FROM awards GROUP BY 2;
+
+-- Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_hero_facets_facet_value ON hero_facets(facet, value);
+CREATE INDEX IF NOT EXISTS idx_heroes_military_unit ON heroes(military_unit);
+
+COMMENT ON MATERIALIZED VIEW hero_facets IS 'Количество героев по району, званию, части, статусу и наградам; обновляется при записи в heroes';
@@ -0,0 +1,22 @@
+-- Background job queue drained by backend/worker
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    dedupe_key VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_pending_run_at ON jobs(run_at, id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_jobs_running_locked_at ON jobs(locked_at) WHERE status = 'running';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_pending_dedupe_key ON jobs(dedupe_key) WHERE status = 'pending';
+
+COMMENT ON COLUMN jobs.status IS 'pending, running, done или dead (исчерпаны попытки)';
+COMMENT ON COLUMN jobs.dedupe_key IS 'Не более одной ожидающей задачи с одинаковым ключом';
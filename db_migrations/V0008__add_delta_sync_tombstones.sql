@@ -0,0 +1,28 @@
+-- Tombstones for deleted heroes and monuments so clients can sync increments
+CREATE TABLE IF NOT EXISTS deleted_records (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(100) NOT NULL,
+    record_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_deleted_records_table_deleted_at ON deleted_records(table_name, deleted_at);
+CREATE INDEX IF NOT EXISTS idx_heroes_updated_at ON heroes(updated_at);
+CREATE INDEX IF NOT EXISTS idx_monuments_updated_at ON t_p26485321_heroes_memorial_init.monuments(updated_at);
+
+CREATE OR REPLACE FUNCTION record_deletion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO deleted_records (table_name, record_id) VALUES (TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_heroes_record_deletion ON heroes;
+CREATE TRIGGER trg_heroes_record_deletion AFTER DELETE ON heroes
+    FOR EACH ROW EXECUTE FUNCTION record_deletion();
+
+DROP TRIGGER IF EXISTS trg_monuments_record_deletion ON t_p26485321_heroes_memorial_init.monuments;
+CREATE TRIGGER trg_monuments_record_deletion AFTER DELETE ON t_p26485321_heroes_memorial_init.monuments
+    FOR EACH ROW EXECUTE FUNCTION record_deletion();
+
+COMMENT ON TABLE deleted_records IS 'Удалённые записи (heroes, monuments) для инкрементальной синхронизации по since=';
@@ -0,0 +1,13 @@
+-- Idempotent intake and concurrent moderation for submissions
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(100);
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS fingerprint CHAR(64);
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(255);
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_submissions_idempotency_key ON submissions(idempotency_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_submissions_pending_fingerprint ON submissions(fingerprint) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_submissions_status_id ON submissions(status, id);
+
+COMMENT ON COLUMN submissions.idempotency_key IS 'Ключ клиента для повторных отправок одной и той же заявки';
+COMMENT ON COLUMN submissions.fingerprint IS 'sha256 от имени героя, email, типа документа и года; не более одной ожидающей заявки';
+COMMENT ON COLUMN submissions.status IS 'pending, in_review, approved или rejected';
@@ -0,0 +1,23 @@
+-- Stamp updated_at and deleted_at with the wall clock at write time instead of transaction start,
+-- so a row becomes visible at most one short commit later than its stamp (covered by SYNC_OVERLAP_SECONDS)
+CREATE OR REPLACE FUNCTION stamp_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp()::timestamp;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_heroes_stamp_updated_at ON heroes;
+CREATE TRIGGER trg_heroes_stamp_updated_at BEFORE INSERT OR UPDATE ON heroes
+    FOR EACH ROW EXECUTE FUNCTION stamp_updated_at();
+
+DROP TRIGGER IF EXISTS trg_monuments_stamp_updated_at ON t_p26485321_heroes_memorial_init.monuments;
+CREATE TRIGGER trg_monuments_stamp_updated_at BEFORE INSERT OR UPDATE ON t_p26485321_heroes_memorial_init.monuments
+    FOR EACH ROW EXECUTE FUNCTION stamp_updated_at();
+
+CREATE OR REPLACE FUNCTION record_deletion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO deleted_records (table_name, record_id, deleted_at) VALUES (TG_TABLE_NAME, OLD.id, clock_timestamp()::timestamp);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,4 @@
+-- Moderators share one login, so a review must present the token issued by the claim that took the row
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS claim_token CHAR(32);
+
+COMMENT ON COLUMN submissions.claim_token IS 'Токен захвата; выдаётся action=claim и обязателен для action=review';
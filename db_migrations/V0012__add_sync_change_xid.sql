@@ -0,0 +1,28 @@
+-- Delta sync cursor tied to commit order: every write records its transaction id (xid8 as bigint),
+-- and clients resume from the xmin of the snapshot that served them, so a late commit is never skipped
+ALTER TABLE heroes ADD COLUMN IF NOT EXISTS change_xid BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE t_p26485321_heroes_memorial_init.monuments ADD COLUMN IF NOT EXISTS change_xid BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE deleted_records ADD COLUMN IF NOT EXISTS change_xid BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_heroes_change_xid ON heroes(change_xid);
+CREATE INDEX IF NOT EXISTS idx_monuments_change_xid ON t_p26485321_heroes_memorial_init.monuments(change_xid);
+CREATE INDEX IF NOT EXISTS idx_deleted_records_table_change_xid ON deleted_records(table_name, change_xid);
+
+CREATE OR REPLACE FUNCTION stamp_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp()::timestamp;
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_deletion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO deleted_records (table_name, record_id, deleted_at, change_xid)
+    VALUES (TG_TABLE_NAME, OLD.id, clock_timestamp()::timestamp, pg_current_xact_id()::text::bigint);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON COLUMN heroes.change_xid IS 'Транзакция последнего изменения; курсор синхронизации since=';
+COMMENT ON COLUMN t_p26485321_heroes_memorial_init.monuments.change_xid IS 'Транзакция последнего изменения; курсор синхронизации since=';
@@ -61,8 +61,8 @@ const HeroCard = ({ hero, onUpdate, onDelete, isEditable = false, authToken, onN
       );
       const files = await response.json();
       const photo = files.find((f: any) => f.file_type === 'photo');
-      if (photo?.file_data) {
-        setHeroPhoto(photo.file_data);
+      if (photo?.file_url) {
+        setHeroPhoto(photo.file_url);
       }
       const documents = files.filter((f: any) => f.file_type === 'document');
       setHeroDocuments(documents);
@@ -266,7 +266,7 @@ const HeroCard = ({ hero, onUpdate, onDelete, isEditable = false, authToken, onN
               {heroDocuments.map((doc) => (
                 <a
                   key={doc.id}
-                  href={doc.file_data}
+                  href={doc.file_url}
                   target="_blank"
                   rel="noopener noreferrer"
                   className="flex items-center gap-2 p-2 rounded-lg bg-muted/30 hover:bg-muted/50 transition-colors border border-primary/20 hover:border-primary/40"
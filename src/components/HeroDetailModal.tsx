@@ -131,7 +131,7 @@ export default function HeroDetailModal({ hero, open, onClose, isEditable = fals
             <div className="space-y-3">
               <div className="flex justify-center">
                 <img
-                  src={heroPhotos[selectedPhotoIndex].file_data}
+                  src={heroPhotos[selectedPhotoIndex].file_url}
                   alt={hero.name}
                   className="w-64 h-64 rounded-lg object-cover border-4 border-primary/30 shadow-lg"
                 />
@@ -149,7 +149,7 @@ export default function HeroDetailModal({ hero, open, onClose, isEditable = fals
                       }`}
                     >
                       <img
-                        src={photo.file_data}
+                        src={photo.file_url}
                         alt={`${hero.name} ${idx + 1}`}
                         className="w-full h-full object-cover"
                       />
@@ -316,7 +316,7 @@ export default function HeroDetailModal({ hero, open, onClose, isEditable = fals
                 {heroDocuments.map((doc) => (
                   <a
                     key={doc.id}
-                    href={doc.file_data}
+                    href={doc.file_url}
                     target="_blank"
                     rel="noopener noreferrer"
                     className="flex items-center gap-3 p-3 rounded-lg bg-muted/30 hover:bg-muted/50 transition-colors border border-primary/20 hover:border-primary/40"
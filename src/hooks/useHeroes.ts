@@ -2,9 +2,11 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { heroesAPI, Hero } from '@/lib/api';
 
 export function useHeroes() {
+  const queryClient = useQueryClient();
+
   return useQuery({
     queryKey: ['heroes'],
-    queryFn: () => heroesAPI.getAll(),
+    queryFn: () => heroesAPI.sync(queryClient.getQueryData<Hero[]>(['heroes'])),
     staleTime: 5 * 60 * 1000,
   });
 }
@@ -18,6 +20,14 @@ export function useHero(id: number) {
   });
 }
 
+export function useHeroStats() {
+  return useQuery({
+    queryKey: ['heroes', 'stats'],
+    queryFn: () => heroesAPI.getStats(),
+    staleTime: 5 * 60 * 1000,
+  });
+}
+
 export function useCreateHero() {
   const queryClient = useQueryClient();
   
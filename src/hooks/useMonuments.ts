@@ -2,9 +2,11 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { monumentsAPI, Monument } from '@/lib/api';
 
 export function useMonuments() {
+  const queryClient = useQueryClient();
+
   return useQuery({
     queryKey: ['monuments'],
-    queryFn: () => monumentsAPI.getAll(),
+    queryFn: () => monumentsAPI.sync(queryClient.getQueryData<Monument[]>(['monuments'])),
     staleTime: 5 * 60 * 1000,
   });
 }
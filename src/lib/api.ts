@@ -2,6 +2,28 @@ const HEROES_API_URL = 'https://functions.poehali.dev/1c7b2c09-4c55-4269-9476-1a
 const MONUMENTS_API_URL = 'https://functions.poehali.dev/bf2e58b3-4260-40d2-a08e-9b97ce17b190';
 const UPLOAD_API_URL = 'https://functions.poehali.dev/b076a2f8-a2c0-45ae-ad4b-74958a2cf7de';
 
+// Server time of this client's last write; echoed on reads so the backend
+// serves them from the primary until the replica has caught up.
+let lastWrite: string | null = null;
+
+function rememberWrite(response: Response) {
+  const stamp = response.headers.get('X-Last-Write');
+  if (stamp) lastWrite = stamp;
+}
+
+function readHeaders(): HeadersInit {
+  return lastWrite ? { 'X-Last-Write': lastWrite } : {};
+}
+
+// Server cursors for delta sync: after the first full load, lists are
+// refreshed with ?since= and merged with the cached copy.
+const syncedAt: Record<'heroes' | 'monuments', string | null> = { heroes: null, monuments: null };
+
+function mergeChanges<T extends { id: number }>(current: T[], changed: T[], deleted: number[]): T[] {
+  const replaced = new Set([...deleted, ...changed.map(item => item.id)]);
+  return [...current.filter(item => !replaced.has(item.id)), ...changed].sort((a, b) => a.id - b.id);
+}
+
 export interface Hero {
   id: number;
   name: string;
@@ -16,20 +38,48 @@ export interface Hero {
   documents?: any[];
 }
 
+export interface HeroStats {
+  total: number;
+  found: number;
+  missing: number;
+  facets: {
+    region: Record<string, number>;
+    rank: Record<string, number>;
+    unit: Record<string, number>;
+    awards: Record<string, number>;
+  };
+}
+
 export const heroesAPI = {
   async getAll(): Promise<Hero[]> {
-    const response = await fetch(HEROES_API_URL);
+    const response = await fetch(HEROES_API_URL, { headers: readHeaders() });
     if (!response.ok) throw new Error('Failed to fetch heroes');
     const data = await response.json();
     return data.heroes || [];
   },
 
+  async sync(current?: Hero[]): Promise<Hero[]> {
+    const since = current ? syncedAt.heroes : null;
+    const url = since ? `${HEROES_API_URL}?since=${encodeURIComponent(since)}` : HEROES_API_URL;
+    const response = await fetch(url, { headers: readHeaders() });
+    if (!response.ok) throw new Error('Failed to fetch heroes');
+    const data = await response.json();
+    syncedAt.heroes = data.syncedAt ?? null;
+    return since && current ? mergeChanges(current, data.heroes || [], data.deleted || []) : data.heroes || [];
+  },
+
   async getById(id: number): Promise<Hero> {
-    const response = await fetch(`${HEROES_API_URL}?id=${id}`);
+    const response = await fetch(`${HEROES_API_URL}?id=${id}`, { headers: readHeaders() });
     if (!response.ok) throw new Error('Failed to fetch hero');
     return response.json();
   },
 
+  async getStats(): Promise<HeroStats> {
+    const response = await fetch(`${HEROES_API_URL}?stats=1`, { headers: readHeaders() });
+    if (!response.ok) throw new Error('Failed to fetch hero stats');
+    return response.json();
+  },
+
   async create(hero: Omit<Hero, 'id'>): Promise<{ id: number; message: string }> {
     const response = await fetch(HEROES_API_URL, {
       method: 'POST',
@@ -37,6 +87,7 @@ export const heroesAPI = {
       body: JSON.stringify(hero),
     });
     if (!response.ok) throw new Error('Failed to create hero');
+    rememberWrite(response);
     return response.json();
   },
 
@@ -47,6 +98,7 @@ export const heroesAPI = {
       body: JSON.stringify(hero),
     });
     if (!response.ok) throw new Error('Failed to update hero');
+    rememberWrite(response);
     return response.json();
   },
 
@@ -55,6 +107,7 @@ export const heroesAPI = {
       method: 'DELETE',
     });
     if (!response.ok) throw new Error('Failed to delete hero');
+    rememberWrite(response);
     return response.json();
   },
 };
@@ -85,14 +138,24 @@ export interface MonumentPhoto {
 
 export const monumentsAPI = {
   async getAll(): Promise<Monument[]> {
-    const response = await fetch(MONUMENTS_API_URL);
+    const response = await fetch(MONUMENTS_API_URL, { headers: readHeaders() });
     if (!response.ok) throw new Error('Failed to fetch monuments');
     const data = await response.json();
     return data.monuments || [];
   },
 
+  async sync(current?: Monument[]): Promise<Monument[]> {
+    const since = current ? syncedAt.monuments : null;
+    const url = since ? `${MONUMENTS_API_URL}?since=${encodeURIComponent(since)}` : MONUMENTS_API_URL;
+    const response = await fetch(url, { headers: readHeaders() });
+    if (!response.ok) throw new Error('Failed to fetch monuments');
+    const data = await response.json();
+    syncedAt.monuments = data.syncedAt ?? null;
+    return since && current ? mergeChanges(current, data.monuments || [], data.deleted || []) : data.monuments || [];
+  },
+
   async getById(id: number): Promise<Monument> {
-    const response = await fetch(`${MONUMENTS_API_URL}?id=${id}`);
+    const response = await fetch(`${MONUMENTS_API_URL}?id=${id}`, { headers: readHeaders() });
     if (!response.ok) throw new Error('Failed to fetch monument');
     return response.json();
   },
@@ -104,6 +167,7 @@ export const monumentsAPI = {
       body: JSON.stringify(monument),
     });
     if (!response.ok) throw new Error('Failed to create monument');
+    rememberWrite(response);
     return response.json();
   },
 
@@ -114,6 +178,7 @@ export const monumentsAPI = {
       body: JSON.stringify(monument),
     });
     if (!response.ok) throw new Error('Failed to update monument');
+    rememberWrite(response);
     return response.json();
   },
 
@@ -122,6 +187,7 @@ export const monumentsAPI = {
       method: 'DELETE',
     });
     if (!response.ok) throw new Error('Failed to delete monument');
+    rememberWrite(response);
     return response.json();
   },
 };
@@ -6,7 +6,7 @@ import LoginModal from '@/components/LoginModal';
 import HeroDetailModal from '@/components/HeroDetailModal';
 import Icon from '@/components/ui/icon';
 import { Hero as APIHero } from '@/lib/api';
-import { useHeroes, useCreateHero, useUpdateHero, useDeleteHero } from '@/hooks/useHeroes';
+import { useHeroes, useHeroStats, useCreateHero, useUpdateHero, useDeleteHero } from '@/hooks/useHeroes';
 import { useToast } from '@/hooks/use-toast';
 import { useAuth } from '@/hooks/useAuth';
 
@@ -14,6 +14,7 @@ type Hero = APIHero;
 
 const Index = () => {
   const { data: heroes = [], isLoading: loading } = useHeroes();
+  const { data: heroStats } = useHeroStats();
   const createHeroMutation = useCreateHero();
   const updateHeroMutation = useUpdateHero();
   const deleteHeroMutation = useDeleteHero();
@@ -89,9 +90,9 @@ const Index = () => {
   };
 
   const stats = {
-    total: heroes.length,
-    found: heroes.filter(h => h.deathYear).length,
-    missing: heroes.filter(h => !h.deathYear).length,
+    total: heroStats?.total ?? 0,
+    found: heroStats?.found ?? 0,
+    missing: heroStats?.missing ?? 0,
     regions: 58,
   };
 